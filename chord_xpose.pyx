@@ -0,0 +1,123 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Kernel en C para transponer acordes en cancioneros grandes.
+
+Recorre los bytes una sola vez reconociendo raíces [A-G][#b]? y sus
+modificadores (m|maj|min|dim|aug|sus|add|dígitos) con la misma semántica de
+límites de palabra que la pasada re.sub de main.transpose_song, pero sin
+volver al intérprete por cada acorde. Solo es equivalente para entrada
+ASCII: \w se aproxima byte a byte y la puntuación multibyte (em-dash,
+comillas curvas) contaría como letra. main.py lo importa de forma opcional
+y lo usa solo para textos grandes que pasan isascii(); si no está
+compilado se usa el camino en Python puro.
+
+Compilar con: cythonize -i chord_xpose.pyx
+"""
+
+# Nuevas raíces ya transpuestas, indexadas por semitono
+_NEW_ROOT = [b'C', b'C#', b'D', b'D#', b'E', b'F', b'F#', b'G', b'G#', b'A', b'A#', b'B']
+
+# Semitono de cada nota natural A..G (ASCII 65..71)
+cdef int _NATURAL[7]
+_NATURAL[0] = 9   # A
+_NATURAL[1] = 11  # B
+_NATURAL[2] = 0   # C
+_NATURAL[3] = 2   # D
+_NATURAL[4] = 4   # E
+_NATURAL[5] = 5   # F
+_NATURAL[6] = 7   # G
+
+
+cdef inline bint _is_word(unsigned char c):
+    # \w exacto solo para ASCII (alfanumérico y '_'); cualquier byte >= 128
+    # se trata como palabra, lo que acierta con letras acentuadas pero no
+    # con puntuación multibyte — por eso main.py exige isascii()
+    return (65 <= c <= 90) or (97 <= c <= 122) or (48 <= c <= 57) or c == 95 or c >= 128
+
+
+cdef Py_ssize_t _match_suffix(const unsigned char* buf, Py_ssize_t i, Py_ssize_t n):
+    """Consume (maj|min|dim|aug|sus|add|m|dígito)* y devuelve la posición final"""
+    cdef unsigned char c, c1, c2
+    while i < n:
+        c = buf[i]
+        if 48 <= c <= 57:  # dígito
+            i += 1
+            continue
+        if i + 2 < n:
+            c1 = buf[i + 1]
+            c2 = buf[i + 2]
+            if ((c == 109 and c1 == 97 and c2 == 106) or   # maj
+                (c == 109 and c1 == 105 and c2 == 110) or  # min
+                (c == 100 and c1 == 105 and c2 == 109) or  # dim
+                (c == 97 and c1 == 117 and c2 == 103) or   # aug
+                (c == 115 and c1 == 117 and c2 == 115) or  # sus
+                (c == 97 and c1 == 100 and c2 == 100)):    # add
+                i += 3
+                continue
+        if c == 109:  # m
+            i += 1
+            continue
+        break
+    return i
+
+
+cdef inline bint _boundary_ok(const unsigned char* buf, Py_ssize_t end, Py_ssize_t n):
+    """\\b al final del token: exactamente un lado debe ser carácter de palabra"""
+    cdef bint last_word = _is_word(buf[end - 1])
+    cdef bint next_word = end < n and _is_word(buf[end])
+    return last_word != next_word
+
+
+cpdef bytes transpose_bytes(bytes data, int semitones):
+    """Transpone todos los acordes de un texto UTF-8 en una sola pasada"""
+    cdef const unsigned char* buf = data
+    cdef Py_ssize_t n = len(data)
+    cdef Py_ssize_t i = 0, root_len, end
+    cdef int idx
+    cdef bint valid_root
+    cdef unsigned char c, nxt
+    out = bytearray()
+
+    while i < n:
+        c = buf[i]
+        # Raíz candidata: A-G precedida de límite de palabra
+        if 65 <= c <= 71 and (i == 0 or not _is_word(buf[i - 1])):
+            idx = _NATURAL[c - 65]
+            root_len = 1
+            valid_root = True
+            if i + 1 < n:
+                nxt = buf[i + 1]
+                if nxt == 35:    # '#'
+                    idx += 1
+                    root_len = 2
+                    # E# y B# no están en la tabla: el acorde queda igual
+                    valid_root = c != 69 and c != 66
+                elif nxt == 98:  # 'b'
+                    idx -= 1
+                    root_len = 2
+                    # Cb y Fb tampoco
+                    valid_root = c != 67 and c != 70
+            end = _match_suffix(buf, i + root_len, n)
+            if root_len == 2 and not _boundary_ok(buf, end, n):
+                if nxt == 35 and end > i + 2:
+                    # La estrella puede pararse justo tras '#' (límite
+                    # no-palabra|palabra), igual que el backtracking de re
+                    end = i + 2
+                else:
+                    # Reintentar con raíz de una sola letra
+                    idx = _NATURAL[c - 65]
+                    root_len = 1
+                    valid_root = True
+                    end = _match_suffix(buf, i + 1, n)
+            if _boundary_ok(buf, end, n):
+                if valid_root:
+                    out += _NEW_ROOT[(idx + semitones + 12) % 12]
+                    out += data[i + root_len:end]
+                else:
+                    # Raíz E#/B#/Cb/Fb: no está en la tabla, se copia igual
+                    out += data[i:end]
+                i = end
+                continue
+        out.append(c)
+        i += 1
+
+    return bytes(out)
@@ -1,17 +1,28 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
+from contextlib import contextmanager
+from functools import lru_cache
 import sqlite3
+import gzip
 import hashlib
+import orjson
 import jwt
 import datetime
+import queue
 import re
 import os
+import time
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from anyio import to_thread
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 
-app = FastAPI(title="Transpose Music App")
+# orjson serializa los listados de canciones varias veces más rápido que json
+app = FastAPI(title="Transpose Music App", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -26,9 +37,63 @@ app.add_middleware(
 SECRET_KEY = os.getenv("SECRET_KEY", "tu_clave_secreta_super_segura_2024_cambiar_en_produccion")
 ALGORITHM = "HS256"
 
+# Pool de conexiones SQLite (evita abrir/cerrar el archivo en cada request)
+DB_PATH = 'music_app.db'
+DB_POOL_SIZE = 8
+DB_POOL = queue.Queue(maxsize=DB_POOL_SIZE)
+
+def _new_connection() -> sqlite3.Connection:
+    # isolation_level=None: autocommit, las transacciones se manejan con BEGIN explícito.
+    # cached_statements amplio: cada sentencia se parsea una sola vez por conexión.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                           cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        PRAGMA page_size=4096;
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=memory;
+        PRAGMA cache_size=-64000;
+        PRAGMA mmap_size=268435456;
+        PRAGMA busy_timeout=5000;
+    ''')
+    return conn
+
+@contextmanager
+def get_conn():
+    """Toma una conexión del pool y la devuelve al terminar
+
+    Si el pool está vacío se abre una conexión extra en vez de bloquear;
+    al devolverla, el excedente por encima del tamaño del pool se cierra.
+    """
+    try:
+        conn = DB_POOL.get_nowait()
+    except queue.Empty:
+        conn = _new_connection()
+    try:
+        yield conn
+    finally:
+        try:
+            DB_POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def save_songs(rows: List[tuple]) -> None:
+    """Guarda un lote de canciones en una sola transacción explícita"""
+    with get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("""INSERT INTO songs (user_id, title, artist, original_song,
+                                transposed_song, original_key, target_key)
+                                VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
 # Inicializar base de datos
 def init_db():
-    conn = sqlite3.connect('music_app.db')
+    conn = _new_connection()
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS users
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,13 +111,65 @@ def init_db():
                   transposed_song TEXT NOT NULL,
                   original_key TEXT,
                   target_key TEXT,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  created_at INTEGER NOT NULL DEFAULT (unixepoch()),
                   FOREIGN KEY (user_id) REFERENCES users (id))''')
-    conn.commit()
+
+    # Índice compuesto: cubre el filtro por usuario y el ORDER BY created_at
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_songs_user_created
+                 ON songs(user_id, created_at DESC)''')
+
+    # Índices NOCASE para que el LIKE de prefijo pueda usar range scan
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_songs_title
+                 ON songs(title COLLATE NOCASE)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS ix_songs_artist
+                 ON songs(artist COLLATE NOCASE)''')
+
+    # Migrar la tabla FTS si viene de la versión sin tokenizer trigram
+    fts_sql = c.execute("SELECT sql FROM sqlite_master WHERE name = 'songs_fts'").fetchone()
+    if fts_sql and 'trigram' not in fts_sql[0]:
+        c.execute("DROP TABLE songs_fts")
+
+    # Tabla FTS5 para búsqueda por título/artista, sincronizada con triggers.
+    # El tokenizer trigram da semántica de subcadena, como el viejo LIKE '%q%'.
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts
+                 USING fts5(title, artist, content='songs', content_rowid='id',
+                            tokenize='trigram')''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS songs_ai AFTER INSERT ON songs BEGIN
+                   INSERT INTO songs_fts(rowid, title, artist)
+                   VALUES (new.id, new.title, new.artist);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS songs_ad AFTER DELETE ON songs BEGIN
+                   INSERT INTO songs_fts(songs_fts, rowid, title, artist)
+                   VALUES ('delete', old.id, old.title, old.artist);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS songs_au AFTER UPDATE ON songs BEGIN
+                   INSERT INTO songs_fts(songs_fts, rowid, title, artist)
+                   VALUES ('delete', old.id, old.title, old.artist);
+                   INSERT INTO songs_fts(rowid, title, artist)
+                   VALUES (new.id, new.title, new.artist);
+                 END''')
+
+    # Si la tabla FTS es nueva pero ya había canciones, reindexar una vez.
+    # Con content= un count(*) sobre songs_fts lee de songs, así que hay
+    # que mirar una shadow table del índice para saber si está vacío.
+    if c.execute("SELECT count(*) FROM songs_fts_docsize").fetchone()[0] == 0 and \
+       c.execute("SELECT count(*) FROM songs").fetchone()[0] > 0:
+        c.execute("INSERT INTO songs_fts(songs_fts) VALUES('rebuild')")
+
     conn.close()
 
 init_db()
 
+@app.on_event("startup")
+async def prefill_pool():
+    # Pre-abrir las conexiones del pool al arrancar cada worker
+    while not DB_POOL.full():
+        DB_POOL.put(_new_connection())
+
+    # Con más hilos que conexiones solo se haría cola dentro de get_conn;
+    # alinear el threadpool de anyio con el tamaño del pool
+    to_thread.current_default_thread_limiter().total_tokens = DB_POOL_SIZE
+
 # Modelos Pydantic
 class UserRegister(BaseModel):
     name: str
@@ -75,9 +192,50 @@ class SearchQuery(BaseModel):
     query: str
     token: str
 
+class SongImport(BaseModel):
+    title: str
+    artist: Optional[str] = None
+    original_song: str
+    transposed_song: str
+    original_key: Optional[str] = None
+    target_key: Optional[str] = None
+
+class ImportRequest(BaseModel):
+    token: str
+    songs: List[SongImport]
+
 # Funciones auxiliares
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+# Argon2id: hash de contraseñas con memoria dura, resistente a GPUs/ASICs.
+# Parámetros según la recomendación de OWASP para presupuestos web (~20-40 ms).
+ph = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2,
+                    hash_len=32, salt_len=16)
+
+# Cache de filas de usuario con expulsión FIFO, como _XPOSE_CACHE. Solo se
+# cachean aciertos: un None cacheado sobreviviría a un registro hecho en
+# otro worker (cache_clear es por proceso) y dejaría a ese email sin poder
+# iniciar sesión hasta reiniciar.
+_USER_ROW_CACHE = {}
+_USER_ROW_CACHE_MAX = 4096
+
+def _user_row(email: str) -> Optional[tuple]:
+    """Busca (id, name, password) por email; cacheado porque casi nunca cambia"""
+    row = _USER_ROW_CACHE.get(email)
+    if row is not None:
+        return row
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, name, password FROM users WHERE email = ?", (email,))
+        row = c.fetchone()
+    if row is not None:
+        if len(_USER_ROW_CACHE) >= _USER_ROW_CACHE_MAX:
+            _USER_ROW_CACHE.pop(next(iter(_USER_ROW_CACHE)))
+        _USER_ROW_CACHE[email] = row
+    return row
+
+def _user_id_for_email(email: str) -> Optional[int]:
+    """id del usuario por email; la caché la aporta _user_row"""
+    row = _user_row(email)
+    return row[0] if row else None
 
 def create_token(email: str) -> str:
     payload = {
@@ -86,76 +244,141 @@ def create_token(email: str) -> str:
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+@lru_cache(maxsize=8192)
+def _decode_token(token: str) -> tuple:
+    """Decodifica y verifica la firma una sola vez por token"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return payload['email'], int(payload['exp'])
+
 def verify_token(token: str) -> Optional[str]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload['email']
-    except:
+        email, exp = _decode_token(token)
+    except Exception:
         return None
+    # La entrada cacheada salta la verificación de exp de jwt.decode
+    if exp < time.time():
+        return None
+    return email
 
 # Sistema de transposición musical
 NOTES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-NOTES_FLAT = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B']
 
-def normalize_chord(chord: str) -> str:
-    """Normaliza acordes con bemoles a sostenidos"""
-    replacements = {
-        'Db': 'C#', 'Eb': 'D#', 'Gb': 'F#', 'Ab': 'G#', 'Bb': 'A#'
-    }
-    for flat, sharp in replacements.items():
-        chord = chord.replace(flat, sharp)
-    return chord
+# Índice de semitono para cada escritura posible de la raíz (sostenidos y bemoles)
+ROOT_MAP = {note: i for i, note in enumerate(NOTES)}
+ROOT_MAP.update({'Db': 1, 'Eb': 3, 'Gb': 6, 'Ab': 8, 'Bb': 10})
+
+# Tabla precalculada: TRANSPOSE_TABLE[semitonos][raíz] -> nueva raíz
+TRANSPOSE_TABLE = [{root: NOTES[(idx + s) % 12] for root, idx in ROOT_MAP.items()}
+                   for s in range(12)]
+
+_ROOT_RE = re.compile(r'^([A-G][#b]?)')
+
+# Patrón para detectar acordes (letras mayúsculas seguidas de modificadores)
+_CHORD_RE = re.compile(r'\b([A-G][#b]?(?:m|maj|min|dim|aug|sus|add|[0-9])*)\b')
+
+# DFA opcional: google-re2 compila el patrón a un autómata sin backtracking.
+# Su \b es solo ASCII, así que se aplica únicamente a textos ASCII puros
+# (las letras con acentos siguen yendo por re, que sí los trata como \w).
+try:
+    import re2 as _re2
+    _CHORD_RE2 = _re2.compile(_CHORD_RE.pattern)
+except ImportError:
+    _CHORD_RE2 = None
+
+# Acelerador opcional en C para cancioneros grandes
+# (compilar con: cythonize -i chord_xpose.pyx)
+try:
+    from chord_xpose import transpose_bytes
+except ImportError:
+    transpose_bytes = None
+
+# Por debajo de este tamaño el re.sub en Python ya es suficientemente rápido
+_LARGE_SONG_BYTES = 4096
 
 def transpose_chord(chord: str, semitones: int) -> str:
-    """Transpone un acorde individual"""
-    if not chord or chord.strip() == '':
+    """Transpone un acorde individual usando la tabla precalculada"""
+    if semitones == 0:
         return chord
 
-    # Normalizar el acorde
-    chord = normalize_chord(chord)
-
-    # Extraer la nota raíz (puede ser C, C#, etc.)
-    match = re.match(r'^([A-G][#b]?)', chord)
+    match = _ROOT_RE.match(chord)
     if not match:
         return chord
 
-    root = match.group(1)
-    suffix = chord[len(root):]
+    new_root = TRANSPOSE_TABLE[semitones].get(match.group(1))
+    if new_root is None:
+        return chord
 
-    # Normalizar bemoles
-    if 'b' in root:
-        root = normalize_chord(root)
+    return new_root + chord[match.end():]
 
-    if root not in NOTES:
-        return chord
+@lru_cache(maxsize=144)
+def _transposer_for(semitones: int):
+    """Devuelve un transpositor especializado para un intervalo, reutilizable
+    entre requests (la mayoría transpone entre las mismas pocas tonalidades)"""
+    def replace_chord(match, _semitones=semitones, _transpose=transpose_chord):
+        return _transpose(match.group(1), _semitones)
+
+    def transposer(song_text, _replace=replace_chord):
+        if _CHORD_RE2 is not None and song_text.isascii():
+            return _CHORD_RE2.sub(_replace, song_text)
+        return _CHORD_RE.sub(_replace, song_text)
 
-    # Calcular nueva posición
-    old_index = NOTES.index(root)
-    new_index = (old_index + semitones) % 12
-    new_root = NOTES[new_index]
+    return transposer
 
-    return new_root + suffix
+def _iter_transposed(song_text: str, semitones: int):
+    """Genera la canción transpuesta por tramos, sin duplicar todo el texto
+
+    Útil para cancioneros de cientos de KB: cada tramo puede liberarse en
+    cuanto se consume, y el generador sirve tal cual para una
+    StreamingResponse si algún endpoint lo necesita.
+    """
+    pos = 0
+    for match in _CHORD_RE.finditer(song_text):
+        yield song_text[pos:match.start()]
+        yield transpose_chord(match.group(1), semitones)
+        pos = match.end()
+    yield song_text[pos:]
 
 def transpose_song(song_text: str, original_key: str, target_key: str) -> str:
     """Transpone toda la canción"""
-    original_key = normalize_chord(original_key)
-    target_key = normalize_chord(target_key)
+    original = ROOT_MAP.get(original_key)
+    target = ROOT_MAP.get(target_key)
 
-    if original_key not in NOTES or target_key not in NOTES:
+    if original is None or target is None:
         raise ValueError("Tonalidad inválida")
 
     # Calcular semitonos de diferencia
-    semitones = (NOTES.index(target_key) - NOTES.index(original_key)) % 12
-
-    # Patrón para detectar acordes (letras mayúsculas seguidas de modificadores)
-    chord_pattern = r'\b([A-G][#b]?(?:m|maj|min|dim|aug|sus|add|[0-9])*)\b'
-
-    def replace_chord(match):
-        chord = match.group(1)
-        return transpose_chord(chord, semitones)
-
-    transposed = re.sub(chord_pattern, replace_chord, song_text)
-    return transposed
+    semitones = (target - original) % 12
+
+    # Misma tonalidad: guardar sin transponer es un caso común
+    if semitones == 0:
+        return song_text
+
+    if len(song_text) > _LARGE_SONG_BYTES:
+        # Solo ASCII: el kernel aproxima \w byte a byte y trataría la
+        # puntuación multibyte (em-dash, comillas curvas) como letra
+        if transpose_bytes is not None and song_text.isascii():
+            return transpose_bytes(song_text.encode('utf-8'), semitones).decode('utf-8')
+        return ''.join(_iter_transposed(song_text, semitones))
+
+    return _transposer_for(semitones)(song_text)
+
+# Cache de resultados: las mismas canciones populares se transponen una y
+# otra vez entre los mismos pares de tonalidades. Clave por hash del texto
+# para no retener el texto original completo como clave.
+_XPOSE_CACHE = {}
+_XPOSE_CACHE_MAX = 2048
+
+def _transpose_cached(song_text: str, original_key: str, target_key: str) -> str:
+    key = (hashlib.blake2b(song_text.encode('utf-8'), digest_size=16).digest(),
+           original_key, target_key)
+    result = _XPOSE_CACHE.get(key)
+    if result is None:
+        result = transpose_song(song_text, original_key, target_key)
+        if len(_XPOSE_CACHE) >= _XPOSE_CACHE_MAX:
+            # Expulsión FIFO: los dicts conservan el orden de inserción
+            _XPOSE_CACHE.pop(next(iter(_XPOSE_CACHE)))
+        _XPOSE_CACHE[key] = result
+    return result
 
 # HTML content inline
 HTML_CONTENT = """<!DOCTYPE html>
@@ -272,6 +495,10 @@ HTML_CONTENT = """<!DOCTYPE html>
                 <div id="songsList" class="space-y-4">
                     <p class="text-gray-500 text-center py-8">Cargando canciones...</p>
                 </div>
+                <button id="loadMoreBtn" onclick="loadSongs(true)"
+                        class="hidden w-full mt-4 bg-purple-600 text-white py-2 rounded-lg hover:bg-purple-700 font-semibold">
+                    Cargar más canciones
+                </button>
             </div>
         </div>
 
@@ -506,17 +733,24 @@ HTML_CONTENT = """<!DOCTYPE html>
             await loadSongs();
         }
 
-        async function loadSongs() {
+        let nextBefore = null;
+        let nextBeforeId = null;
+
+        async function loadSongs(append = false) {
             try {
-                const response = await fetch(`/api/my-songs?token=${currentToken}`);
+                let url = `/api/my-songs?token=${currentToken}`;
+                if (append && nextBefore !== null) {
+                    url += `&before=${nextBefore}&before_id=${nextBeforeId}`;
+                }
+                const response = await fetch(url);
                 const data = await response.json();
 
                 const songsList = document.getElementById('songsList');
 
-                if (data.songs.length === 0) {
+                if (!append && data.songs.length === 0) {
                     songsList.innerHTML = '<p class="text-gray-500 text-center py-8">No tienes canciones guardadas. ¡Crea tu primera transposición! 🎵</p>';
                 } else {
-                    songsList.innerHTML = data.songs.map(song => `
+                    const songsHtml = data.songs.map(song => `
                         <div class="border rounded-lg p-4 hover:shadow-lg transition cursor-pointer" onclick="viewSong(${song.id})">
                             <div class="flex justify-between items-start">
                                 <div class="flex-1">
@@ -524,7 +758,7 @@ HTML_CONTENT = """<!DOCTYPE html>
                                     <p class="text-gray-600">${song.artist}</p>
                                     <div class="mt-2 flex gap-4 text-sm text-gray-500">
                                         <span>🎵 ${song.original_key} → ${song.target_key}</span>
-                                        <span>📅 ${new Date(song.date).toLocaleDateString()}</span>
+                                        <span>📅 ${new Date(typeof song.date === 'number' ? song.date * 1000 : song.date).toLocaleDateString()}</span>
                                     </div>
                                 </div>
                                 <button onclick="event.stopPropagation(); viewSong(${song.id})" 
@@ -534,7 +768,16 @@ HTML_CONTENT = """<!DOCTYPE html>
                             </div>
                         </div>
                     `).join('');
+                    if (append) {
+                        songsList.insertAdjacentHTML('beforeend', songsHtml);
+                    } else {
+                        songsList.innerHTML = songsHtml;
+                    }
                 }
+
+                nextBefore = data.next_before ?? null;
+                nextBeforeId = data.next_before_id ?? null;
+                document.getElementById('loadMoreBtn').classList.toggle('hidden', nextBefore === null);
             } catch (error) {
                 alert('Error al cargar canciones: ' + error.message);
             }
@@ -707,22 +950,45 @@ HTML_CONTENT = """<!DOCTYPE html>
 </body>
 </html>"""
 
+# La portada se comprime una sola vez; el ETag permite 304 en visitas repetidas
+_HTML_BYTES = HTML_CONTENT.encode('utf-8')
+_HTML_GZ = gzip.compress(_HTML_BYTES, 9)
+_HTML_ETAG = '"%s"' % hashlib.blake2b(_HTML_BYTES, digest_size=8).hexdigest()
+
+# Copia estática por si un proxy inverso quiere servirla directamente
+os.makedirs('static', exist_ok=True)
+with open('static/index.html.gz', 'wb') as f:
+    f.write(_HTML_GZ)
+
 # Endpoints
-@app.get("/", response_class=HTMLResponse)
-async def read_root():
-    return HTML_CONTENT
+@app.get("/")
+async def read_root(request: Request):
+    if request.headers.get('if-none-match') == _HTML_ETAG:
+        return Response(status_code=304)
+    headers = {'ETag': _HTML_ETAG,
+               'Cache-Control': 'public, max-age=3600',
+               'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(content=_HTML_GZ, media_type='text/html', headers=headers)
+    return Response(content=_HTML_BYTES, media_type='text/html', headers=headers)
+
+def _insert_user(name: str, email: str, hashed_pw: str) -> None:
+    with get_conn() as conn:
+        conn.execute("INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
+                     (name, email, hashed_pw))
+
+def _update_password(email: str, hashed_pw: str) -> None:
+    with get_conn() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE email = ?", (hashed_pw, email))
 
 @app.post("/api/register")
 async def register(user: UserRegister):
     try:
-        conn = sqlite3.connect('music_app.db')
-        c = conn.cursor()
-
-        hashed_pw = hash_password(user.password)
-        c.execute("INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-                  (user.name, user.email, hashed_pw))
-        conn.commit()
-        conn.close()
+        # ph.hash es CPU-intensivo a propósito: fuera del event loop
+        hashed_pw = await run_in_threadpool(ph.hash, user.password)
+        await run_in_threadpool(_insert_user, user.name, user.email, hashed_pw)
+        _USER_ROW_CACHE.clear()
 
         token = create_token(user.email)
         return {"success": True, "message": "Usuario registrado exitosamente", "token": token, "name": user.name}
@@ -733,41 +999,45 @@ async def register(user: UserRegister):
 
 @app.post("/api/login")
 async def login(user: UserLogin):
-    conn = sqlite3.connect('music_app.db')
-    c = conn.cursor()
-
-    hashed_pw = hash_password(user.password)
-    c.execute("SELECT name FROM users WHERE email = ? AND password = ?",
-              (user.email, hashed_pw))
-    result = c.fetchone()
-    conn.close()
+    row = await run_in_threadpool(_user_row, user.email)
+    if not row:
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
-    if result:
-        token = create_token(user.email)
-        return {"success": True, "message": "Login exitoso", "token": token, "name": result[0]}
-    else:
+    try:
+        await run_in_threadpool(ph.verify, row[2], user.password)
+    except (VerificationError, InvalidHashError):
+        # InvalidHashError cubre hashes de esquemas anteriores: re-registrarse
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
+    if ph.check_needs_rehash(row[2]):
+        # Actualizar el hash si los parámetros de Argon2 cambiaron
+        new_hash = await run_in_threadpool(ph.hash, user.password)
+        await run_in_threadpool(_update_password, user.email, new_hash)
+        _USER_ROW_CACHE.pop(user.email, None)
+
+    token = create_token(user.email)
+    return {"success": True, "message": "Login exitoso", "token": token, "name": row[1]}
+
+def _save_transposed(email: str, request: TransposeRequest, transposed: str) -> None:
+    # user_id sale de la caché por sesión: el guardado es un único INSERT
+    user_id = _user_id_for_email(email)
+    if user_id is None:
+        return
+    save_songs([(user_id, request.song_title or "Sin título",
+                 request.artist or "Desconocido", request.song_text,
+                 transposed, request.original_key, request.target_key)])
+
 @app.post("/api/transpose")
-async def transpose(request: TransposeRequest):
+async def transpose(request: TransposeRequest, background: BackgroundTasks):
     try:
-        transposed = transpose_song(request.song_text, request.original_key, request.target_key)
+        transposed = _transpose_cached(request.song_text, request.original_key, request.target_key)
 
         if request.token:
             email = verify_token(request.token)
             if email:
-                conn = sqlite3.connect('music_app.db')
-                c = conn.cursor()
-                c.execute("SELECT id FROM users WHERE email = ?", (email,))
-                user = c.fetchone()
-
-                if user:
-                    c.execute("""INSERT INTO songs (user_id, title, artist, original_song, transposed_song, 
-                                original_key, target_key) VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                              (user[0], request.song_title or "Sin título", request.artist or "Desconocido",
-                               request.song_text, transposed, request.original_key, request.target_key))
-                    conn.commit()
-                conn.close()
+                # El cliente solo necesita el texto transpuesto: el INSERT
+                # sale del camino crítico y corre tras enviar la respuesta
+                background.add_task(_save_transposed, email, request, transposed)
 
         return {
             "success": True,
@@ -781,38 +1051,116 @@ async def transpose(request: TransposeRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al transponer: {str(e)}")
 
+@app.post("/api/import-songs")
+async def import_songs(request: ImportRequest):
+    """Importa un lote de canciones en una sola transacción (executemany)"""
+    email = verify_token(request.token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    user_id = await run_in_threadpool(_user_id_for_email, email)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    rows = [(user_id, s.title, s.artist or "Desconocido", s.original_song,
+             s.transposed_song, s.original_key, s.target_key)
+            for s in request.songs]
+    if rows:
+        await run_in_threadpool(save_songs, rows)
+
+    return {"success": True, "imported": len(rows)}
+
+def _fetch_songs(user_id: int, full: bool = False, limit: int = 50,
+                 before: Optional[str] = None,
+                 before_id: Optional[int] = None) -> list:
+    # El listado solo pinta título/artista/tonalidades/fecha: omitir los
+    # cuerpos de la canción evita arrastrar kilobytes de letra por fila.
+    # /api/song/{id} (o full=1) sigue devolviendo los textos completos.
+    columns = """id, title, artist, original_key, target_key,
+                 created_at AS date"""
+    if full:
+        columns = """id, title, artist, original_song AS original,
+                     transposed_song AS transposed, original_key,
+                     target_key, created_at AS date"""
+    with get_conn() as conn:
+        c = conn.cursor()
+        # Paginación por cursor compuesto (created_at, id) en vez de OFFSET,
+        # que re-escanearía las filas saltadas. El desempate por id importa:
+        # created_at es en segundos y un import masivo deja muchas filas con
+        # el mismo valor. Filtro y ORDER BY los resuelve ix_songs_user_created.
+        c.execute(f"""SELECT {columns}
+                     FROM songs
+                     WHERE user_id = ?
+                       AND (? IS NULL OR created_at < ?
+                            OR (created_at = ? AND id < ?))
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT ?""",
+                  (user_id, before, before, before, before_id, limit))
+        return c.fetchall()
+
 @app.get("/api/my-songs")
-async def get_my_songs(token: str):
+async def get_my_songs(token: str, full: int = 0, limit: int = 50,
+                       before: Optional[str] = None,
+                       before_id: Optional[int] = None):
     email = verify_token(token)
     if not email:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    conn = sqlite3.connect('music_app.db')
-    c = conn.cursor()
-    c.execute("""SELECT s.id, s.title, s.artist, s.original_song, s.transposed_song, s.original_key, 
-                 s.target_key, s.created_at 
-                 FROM songs s 
-                 JOIN users u ON s.user_id = u.id 
-                 WHERE u.email = ? 
-                 ORDER BY s.created_at DESC""", (email,))
-    songs = c.fetchall()
-    conn.close()
+    user_id = await run_in_threadpool(_user_id_for_email, email)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
 
-    return {
-        "success": True,
-        "songs": [
-            {
-                "id": s[0],
-                "title": s[1],
-                "artist": s[2],
-                "original": s[3],
-                "transposed": s[4],
-                "original_key": s[5],
-                "target_key": s[6],
-                "date": s[7]
-            } for s in songs
-        ]
-    }
+    limit = max(1, min(limit, 200))
+    if before is not None and before.isdigit():
+        # created_at es INTEGER: comparar texto contra entero en SQLite
+        # ordena por tipo, no por valor, así que el cursor llega como int
+        before = int(before)
+    songs = await run_in_threadpool(_fetch_songs, user_id, bool(full),
+                                    limit, before, before_id)
+
+    payload = {"success": True, "songs": [dict(s) for s in songs]}
+    if len(songs) == limit:
+        # Cursor para la página siguiente; None/ausente si ya no hay más
+        payload["next_before"] = songs[-1]["date"]
+        payload["next_before_id"] = songs[-1]["id"]
+
+    # Response directa: evita la capa de jsonable_encoder en el listado
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+def _search_fts(user_id: int, match_query: str) -> list:
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("""SELECT s.id, s.title, s.artist, s.original_key, s.target_key,
+                     s.created_at AS date
+                     FROM songs_fts f
+                     JOIN songs s ON s.id = f.rowid
+                     WHERE songs_fts MATCH ? AND s.user_id = ?
+                     ORDER BY s.created_at DESC LIMIT 20""",
+                  (match_query, user_id))
+        return c.fetchall()
+
+def _recent_songs(user_id: int) -> list:
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("""SELECT id, title, artist, original_key, target_key,
+                     created_at AS date
+                     FROM songs
+                     WHERE user_id = ?
+                     ORDER BY created_at DESC LIMIT 20""", (user_id,))
+        return c.fetchall()
+
+def _search_like(user_id: int, query: str) -> list:
+    # Patrón anclado: un LIKE con % inicial nunca puede usar índice
+    pattern = f"{query}%"
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("""SELECT id, title, artist, original_key, target_key,
+                     created_at AS date
+                     FROM songs
+                     WHERE user_id = ? AND (title LIKE ? OR artist LIKE ?)
+                     ORDER BY created_at DESC LIMIT 20""",
+                  (user_id, pattern, pattern))
+        return c.fetchall()
 
 @app.post("/api/search")
 async def search_songs(search: SearchQuery):
@@ -820,32 +1168,34 @@ async def search_songs(search: SearchQuery):
     if not email:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    conn = sqlite3.connect('music_app.db')
-    c = conn.cursor()
+    user_id = await run_in_threadpool(_user_id_for_email, email)
+    if user_id is None:
+        return {"success": True, "results": []}
+
+    # Las comillas son el único operador dentro de una frase FTS5
+    query = search.query.strip().replace('"', '')
+    if not query:
+        # Consulta vacía: las 20 más recientes por el índice, sin LIKE ni FTS
+        results = await run_in_threadpool(_recent_songs, user_id)
+    elif len(query) >= 3:
+        # Frase entre comillas: búsqueda por subcadena vía trigram
+        results = await run_in_threadpool(_search_fts, user_id, f'"{query}"')
+    else:
+        # trigram necesita al menos 3 caracteres; para menos, LIKE directo
+        results = await run_in_threadpool(_search_like, user_id, query)
 
-    query_pattern = f"%{search.query}%"
-    c.execute("""SELECT s.id, s.title, s.artist, s.original_key, s.target_key, s.created_at 
-                 FROM songs s 
-                 JOIN users u ON s.user_id = u.id 
-                 WHERE u.email = ? AND (s.title LIKE ? OR s.artist LIKE ?)
-                 ORDER BY s.created_at DESC LIMIT 20""", 
-              (email, query_pattern, query_pattern))
-    results = c.fetchall()
-    conn.close()
+    return Response(orjson.dumps({"success": True, "results": [dict(r) for r in results]}),
+                    media_type="application/json")
 
-    return {
-        "success": True,
-        "results": [
-            {
-                "id": r[0],
-                "title": r[1],
-                "artist": r[2],
-                "original_key": r[3],
-                "target_key": r[4],
-                "date": r[5]
-            } for r in results
-        ]
-    }
+def _fetch_song(user_id: int, song_id: int) -> Optional[tuple]:
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("""SELECT id, title, artist, original_song AS original,
+                     transposed_song AS transposed, original_key, target_key,
+                     created_at AS date
+                     FROM songs
+                     WHERE user_id = ? AND id = ?""", (user_id, song_id))
+        return c.fetchone()
 
 @app.get("/api/song/{song_id}")
 async def get_song(song_id: int, token: str):
@@ -853,32 +1203,23 @@ async def get_song(song_id: int, token: str):
     if not email:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    conn = sqlite3.connect('music_app.db')
-    c = conn.cursor()
-    c.execute("""SELECT s.id, s.title, s.artist, s.original_song, s.transposed_song, 
-                 s.original_key, s.target_key, s.created_at 
-                 FROM songs s 
-                 JOIN users u ON s.user_id = u.id 
-                 WHERE u.email = ? AND s.id = ?""", (email, song_id))
-    song = c.fetchone()
-    conn.close()
+    user_id = await run_in_threadpool(_user_id_for_email, email)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    song = await run_in_threadpool(_fetch_song, user_id, song_id)
 
     if not song:
         raise HTTPException(status_code=404, detail="Canción no encontrada")
 
-    return {
-        "success": True,
-        "song": {
-            "id": song[0],
-            "title": song[1],
-            "artist": song[2],
-            "original": song[3],
-            "transposed": song[4],
-            "original_key": song[5],
-            "target_key": song[6],
-            "date": song[7]
-        }
-    }
+    return Response(orjson.dumps({"success": True, "song": dict(song)}),
+                    media_type="application/json")
+
+def _delete_song(user_id: int, song_id: int) -> bool:
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM songs WHERE id = ? AND user_id = ?", (song_id, user_id))
+        return c.rowcount > 0
 
 @app.delete("/api/song/{song_id}")
 async def delete_song(song_id: int, token: str):
@@ -886,13 +1227,11 @@ async def delete_song(song_id: int, token: str):
     if not email:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    conn = sqlite3.connect('music_app.db')
-    c = conn.cursor()
-    c.execute("""DELETE FROM songs WHERE id = ? AND user_id = (
-                 SELECT id FROM users WHERE email = ?)""", (song_id, email))
-    conn.commit()
-    deleted = c.rowcount > 0
-    conn.close()
+    user_id = await run_in_threadpool(_user_id_for_email, email)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    deleted = await run_in_threadpool(_delete_song, user_id, song_id)
 
     if deleted:
         return {"success": True, "message": "Canción eliminada"}
@@ -902,4 +1241,4 @@ async def delete_song(song_id: int, token: str):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")